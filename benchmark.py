@@ -0,0 +1,297 @@
+""" Benchmarks for the password manager.
+
+Run all benchmarks with `python benchmark.py`, or name the ones to run,
+e.g. `python benchmark.py suggest`. Vault benchmarks build synthetic vaults
+of each size in --sizes (10 up to 1,000,000 entries) on a temporary
+directory. Pass --memory to also record peak Python heap usage with
+tracemalloc, which slows the timed code down noticeably.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import main as vault
+from main import (NameIndex, PasswordManager, decrypt_password, encrypt_password, generate_key,
+                  generate_passwords, load_key, suggest_password)
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+BACKENDS = {'file': 'passwords.json', 'sqlite': 'passwords.db'}
+
+LEGACY_CHARACTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890!@#$%^&*()_+'
+
+def legacy_suggest_password(length=16):
+    """ The original random.choice implementation, kept as a baseline """
+    return ''.join(random.choice(LEGACY_CHARACTERS) for _ in range(length))
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def report(name: str, seconds: float, operations: int, peak: int = None):
+    line = f"{name:<40} {seconds * 1000:10.1f} ms {operations / seconds:14,.0f} ops/s"
+    if peak is not None:
+        line += f" {peak / 1024:12,.0f} KiB peak"
+    print(line)
+
+def measure(memory: bool, function, *args):
+    """ Returns (seconds, peak traced bytes or None, result) for one call """
+    if not memory:
+        elapsed, result = timed(function, *args)
+        return elapsed, None, result
+    tracemalloc.start()
+    try:
+        elapsed, result = timed(function, *args)
+        return elapsed, tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+def write_key_file(path: str, size: int = 64) -> bytes:
+    with open(path, 'wb') as file:
+        remaining = size
+        while remaining:
+            chunk = min(remaining, 1024 * 1024)
+            file.write(os.urandom(chunk))
+            remaining -= chunk
+    return generate_key(path)
+
+def build_vault(directory: str, size: int, backend: str):
+    """ Creates a vault of size synthetic records; returns (vault path, key file path, key) """
+    key_path = os.path.join(directory, 'key')
+    key = write_key_file(key_path)
+    vault_path = os.path.join(directory, BACKENDS[backend])
+    manager = PasswordManager(vault_path, key)
+    passwords = generate_passwords(size, 16)
+    manager.import_passwords(
+        (service, account, password) for (service, account), password in zip(synthetic_names(size), passwords)
+    )
+    manager.vault.close()
+    return vault_path, key_path, key
+
+def parse_sizes(text: str):
+    return [int(size) for size in text.split(',') if size.strip()]
+
+def selected_backends(args):
+    return list(BACKENDS) if args.backend == 'all' else [args.backend]
+
+# Password Generation
+def bench_suggest(args):
+    count = args.count
+    elapsed, _ = timed(lambda: [legacy_suggest_password(16) for _ in range(count)])
+    report(f"legacy suggest_password x{count}", elapsed, count)
+    elapsed, _ = timed(lambda: list(generate_passwords(count, 16)))
+    report(f"generate_passwords x{count}", elapsed, count)
+    elapsed, _ = timed(lambda: list(generate_passwords(count, 16, min_digits=2, min_symbols=2)))
+    report(f"generate_passwords x{count} (policy)", elapsed, count)
+    repeats = min(count, 10000)
+    elapsed, _ = timed(lambda: [suggest_password(16) for _ in range(repeats)])
+    report(f"suggest_password x{repeats}", elapsed, repeats)
+
+# Encryption and Key Derivation
+def bench_crypto(args):
+    count = min(args.count, 100000)
+    key = generate_key(__file__)
+    elapsed, peak, tokens = measure(args.memory, lambda: [encrypt_password(key, 'p' * 16) for _ in range(count)])
+    report(f"encrypt_password x{count}", elapsed, count, peak)
+    elapsed, peak, _ = measure(args.memory, lambda: [decrypt_password(key, token) for token in tokens])
+    report(f"decrypt_password x{count}", elapsed, count, peak)
+
+def bench_key(args):
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in parse_sizes(args.key_sizes):
+            path = os.path.join(directory, f"key-{megabytes}")
+            write_key_file(path, megabytes * 1024 * 1024)
+            elapsed, peak, _ = measure(args.memory, generate_key, path)
+            report(f"generate_key {megabytes} MiB", elapsed, 1, peak)
+            vault.forget_key()
+            load_key(path)
+            repeats = 1000
+            elapsed, _ = timed(lambda: [load_key(path) for _ in range(repeats)])
+            report(f"load_key {megabytes} MiB (cached) x{repeats}", elapsed, repeats)
+
+# Vault Operations
+def bench_vault(args):
+    for backend in selected_backends(args):
+        for size in parse_sizes(args.sizes):
+            with tempfile.TemporaryDirectory() as directory:
+                label = f"{backend} {size:,}"
+                elapsed, peak, (vault_path, _, key) = measure(args.memory, build_vault, directory, size, backend)
+                report(f"import {label}", elapsed, size, peak)
+
+                elapsed, peak, manager = measure(args.memory, PasswordManager, vault_path, key)
+                report(f"open {label}", elapsed, 1, peak)
+
+                names = list(synthetic_names(size))
+                probes = [random.choice(names) for _ in range(min(1000, size))]
+                elapsed, peak, _ = measure(args.memory, lambda: [manager.get_password(*name) for name in probes])
+                report(f"get_password {label} x{len(probes)}", elapsed, len(probes), peak)
+
+                added = [(f"bench-{i}.example.com", f"user{i}", f"password-{i}") for i in range(200)]
+                elapsed, peak, _ = measure(args.memory, lambda: [manager.add_password(*row) for row in added])
+                report(f"add_password {label} x{len(added)}", elapsed, len(added), peak)
+
+                elapsed, peak, _ = measure(args.memory, lambda: [manager.delete_password(*row[:2]) for row in added])
+                report(f"delete_password {label} x{len(added)}", elapsed, len(added), peak)
+
+                elapsed, peak, passwords = measure(args.memory, manager.load_passwords)
+                report(f"load_passwords {label}", elapsed, size, peak)
+
+                elapsed, peak, _ = measure(args.memory, manager.save_passwords, passwords)
+                report(f"save_passwords {label}", elapsed, size, peak)
+                manager.vault.close()
+
+# Command-Line Cold Start
+def run_cli(arguments):
+    """ Runs main.py once; returns (wall seconds, peak RSS in KiB or None, --profile report) """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN_SCRIPT, '--profile', '--no-agent', *arguments],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    process.stderr.close()
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        peak = usage.ru_maxrss
+    else:
+        process.wait()
+        peak = None
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise SystemExit(f"main.py {' '.join(arguments)} failed:\n{stderr.decode()}")
+    return elapsed, peak, json.loads(stderr.decode().strip().splitlines()[-1])
+
+def report_cli(name: str, runs):
+    runs = sorted(runs, key=lambda run: run[0])
+    elapsed, peak, profile = runs[len(runs) // 2]
+    peak_text = f" {peak:12,} KiB RSS" if peak is not None else ""
+    print(f"{name:<40} {elapsed * 1000:10.1f} ms median of {len(runs)}{peak_text}")
+    phases = ', '.join(f"{phase} {ms:.1f}" for phase, ms in profile['phases_ms'].items())
+    print(f"{'':<40} phases (ms): {phases}")
+
+def bench_cli(args):
+    repeats = 5
+    report_cli("cli --suggest", [run_cli(['--suggest']) for _ in range(repeats)])
+    for backend in selected_backends(args):
+        for size in parse_sizes(args.sizes):
+            with tempfile.TemporaryDirectory() as directory:
+                vault_path, key_path, _ = build_vault(directory, size, backend)
+                service, account = random.choice(list(synthetic_names(size)))
+                arguments = ['--key-file', key_path, '--vault', vault_path]
+                runs = [run_cli(arguments + ['--get', '--service', service, '--account', account])
+                        for _ in range(repeats)]
+                report_cli(f"cli --get {backend} {size:,}", runs)
+                runs = [run_cli(arguments + ['--add', '--service', 'cli.example.com', '--account', f"user{i}",
+                                             '--password', 'secret']) for i in range(repeats)]
+                report_cli(f"cli --add {backend} {size:,}", runs)
+
+# Name Search
+def synthetic_names(count: int):
+    """ Yields count (service, account) pairs spread over count // 10 services """
+    services = max(1, count // 10)
+    for i in range(count):
+        yield f"service-{i % services}.example.com", f"user{i}@mail.example.org"
+
+def bench_search(args):
+    count = args.count
+    elapsed, index = timed(NameIndex, synthetic_names(count))
+    report(f"NameIndex build x{count}", elapsed, count)
+    elapsed, _ = timed(index.listing)
+    report(f"NameIndex listing x{count}", elapsed, count)
+    patterns = [
+        'service-42.example.com',  # exact service
+        'service-7',  # prefix shared by many services
+        'user12345',  # account prefix
+        f"user{count // 2}@",  # selective substring
+        'example',  # substring of every service
+        'mail.example',  # substring of every account
+        'us',  # short prefix
+        'sevrice-999',  # typo, fuzzy fallback
+    ]
+    repeats = 100
+    for pattern in patterns:
+        elapsed, _ = timed(lambda: [index.search(pattern) for _ in range(repeats)])
+        matches = len(index.search(pattern))
+        print(f"search {pattern!r:<34} {elapsed / repeats * 1e6:10.1f} us {matches:6} matches")
+
+# Concurrent Writers
+def _concurrent_writer(vault_path: str, key: bytes, worker: int, count: int):
+    # Small thresholds so index rebuilds and compactions race with other writers
+    vault.INDEX_TAIL_MAX = 64
+    vault.COMPACT_MIN_DEAD = 32
+    manager = PasswordManager(vault_path, key)
+    expected = {}
+    for i in range(count):
+        service, account = f"svc{i % 50}", f"w{worker}-{i}"
+        manager.add_password(service, account, f"{worker}:{i}")
+        expected[(service, account)] = f"{worker}:{i}"
+        if i % 2 == 1:  # Leave dead records behind for compaction
+            manager.delete_password(service, account)
+            del expected[(service, account)]
+    return expected
+
+def bench_concurrent(args):
+    """ Stress test: parallel writer processes must not lose each other's updates """
+    workers = max(4, os.cpu_count() or 1)
+    per_worker = max(1, min(args.count, 20000) // workers)
+    with tempfile.TemporaryDirectory() as directory:
+        key_path = os.path.join(directory, 'key')
+        with open(key_path, 'wb') as file:
+            file.write(os.urandom(64))
+        key = generate_key(key_path)
+        for vault_name in (BACKENDS[backend] for backend in selected_backends(args)):
+            vault_path = os.path.join(directory, vault_name)
+            start = time.perf_counter()
+            with ProcessPoolExecutor(workers) as pool:
+                results = pool.map(_concurrent_writer, [vault_path] * workers, [key] * workers,
+                                   range(workers), [per_worker] * workers)
+                expected = {}
+                for result in results:
+                    expected.update(result)
+            elapsed = time.perf_counter() - start
+            stored = {
+                (service, account): password
+                for service, account, password in PasswordManager(vault_path, key).iter_passwords()
+            }
+            operations = workers * (per_worker + per_worker // 2)
+            report(f"{workers} concurrent writers x{per_worker} ({vault_name})", elapsed, operations)
+            if stored != expected:
+                lost = len(set(expected) - set(stored))
+                stale = len(set(stored) - set(expected))
+                raise SystemExit(f"Concurrent writes to {vault_name} lost {lost} records and left {stale} stale ones")
+            print(f"{'':<40} all {len(expected)} records intact")
+
+BENCHMARKS = {
+    'suggest': bench_suggest,
+    'crypto': bench_crypto,
+    'key': bench_key,
+    'vault': bench_vault,
+    'search': bench_search,
+    'cli': bench_cli,
+    'concurrent': bench_concurrent,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Password Manager benchmarks')
+    parser.add_argument('benchmarks', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--count', type=int, default=100000, help='Number of operations per benchmark')
+    parser.add_argument('--sizes', default='10,1000,100000',
+                        help='Comma-separated synthetic vault sizes, e.g. 10,100,1000,10000,100000,1000000')
+    parser.add_argument('--backend', choices=['all', *BACKENDS], default='all', help='Vault backends to benchmark')
+    parser.add_argument('--key-sizes', default='1,64', help='Comma-separated key file sizes in MiB')
+    parser.add_argument('--memory', action='store_true', help='Record peak Python heap usage with tracemalloc')
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args)
+
+if __name__ == "__main__":
+    main()
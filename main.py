@@ -1,95 +1,1384 @@
+import time
+_STARTED = time.perf_counter()  # Before the remaining imports, so --profile can time them
+
 import json
 import os
+import abc
 import argparse
+import bisect
+import collections
+import csv
+import contextlib
+import functools
 from base64 import urlsafe_b64encode
-from cryptography.fernet import Fernet
 import hashlib
+import hmac
+import heapq
+import mmap
+import secrets
+import shutil
+import struct
 import getpass
-import random
-from colored import fg, attr
+import socket
+import sqlite3
+import stat
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Profiling
+class Profiler:
+    """ Accumulates exclusive wall-clock time per named phase.
+
+    Phases nest: while an inner phase runs, the outer one is paused, so the
+    timings add up to the time spent inside any phase. When disabled,
+    phase() hands out a shared no-op context manager.
+    """
+    _disabled = contextlib.nullcontext()
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}
+        self.calls = {}
+        self._stack = []  # [phase name, start of its current slice]
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return self._disabled
+        return _Phase(self, name)
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _enter(self, name: str):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.phases[outer[0]] = self.phases.get(outer[0], 0.0) + now - outer[1]
+        self._stack.append([name, now])
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _exit(self):
+        now = time.perf_counter()
+        name, start = self._stack.pop()
+        self.phases[name] = self.phases.get(name, 0.0) + now - start
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def report(self) -> dict:
+        return {
+            'total_ms': round((time.perf_counter() - _STARTED) * 1000, 3),
+            'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            'calls': dict(self.calls),
+        }
+
+class _Phase:
+    __slots__ = ('profiler', 'name')
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+
+    def __exit__(self, *exc_info):
+        self.profiler._exit()
+
+profiler = Profiler()
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
+def highlight(text: str) -> str:
+    with profiler.phase('import'):
+        from colored import fg, attr  # Imported lazily to keep agent client start-up cheap
+    return f"{fg(2)}{text}{attr(0)}"
+
 # Generate and Store Key
+KEY_CHUNK_SIZE = 1024 * 1024
+KEYRING_SERVICE = 'felinesecure'
+_key_cache = {}  # real path -> (file fingerprint, key)
+
 def generate_key(file_path: str) -> bytes:
-    """ Generates a key based on the hash of a specified file """
-    with open(file_path, 'rb') as file:
-        file_hash = hashlib.sha256(file.read()).digest()
-    return urlsafe_b64encode(file_hash)
+    """ Generates a key based on the hash of a specified file, read in fixed-size chunks """
+    file_hash = hashlib.sha256()
+    buffer = bytearray(KEY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as file:
+        while True:
+            read = file.readinto(buffer)
+            if not read:
+                break
+            file_hash.update(view[:read])
+    return urlsafe_b64encode(file_hash.digest())
+
+def _key_fingerprint(file_path: str) -> str:
+    stat = os.stat(file_path)
+    return f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def _keyring():
+    try:
+        import keyring
+        import keyring.errors
+    except ImportError:
+        return None
+    return keyring
+
+def _warn_no_keyring(reason: str):
+    print(f"{reason}; the key will not be cached between runs.")
+
+def load_key(file_path: str, use_keyring: bool = False) -> bytes:
+    """ Returns the key for a key file, rehashing it only if the file changed since it was cached.
+
+    Keys are always cached for the life of the process. With use_keyring they
+    are also stored in the system keyring (if the optional keyring package is
+    installed) so later runs can skip hashing too.
+    """
+    with profiler.phase('key derivation'):
+        return _load_key(os.path.realpath(file_path), use_keyring)
+
+def _load_key(path: str, use_keyring: bool) -> bytes:
+    fingerprint = _key_fingerprint(path)
+    cached = _key_cache.get(path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    keyring = _keyring() if use_keyring else None
+    stored = None
+    if keyring is not None:
+        try:
+            stored = keyring.get_password(KEYRING_SERVICE, path)
+        except keyring.errors.KeyringError as error:  # e.g. no backend on a headless host
+            _warn_no_keyring(f"The system keyring is unavailable ({error})")
+            keyring = None
+    if stored is not None:
+        stored_fingerprint, _, stored_key = stored.rpartition('|')
+        if stored_fingerprint == fingerprint:
+            _key_cache[path] = (fingerprint, stored_key.encode())
+            return stored_key.encode()
+    key = generate_key(path)
+    _key_cache[path] = (fingerprint, key)
+    if keyring is not None:
+        try:
+            keyring.set_password(KEYRING_SERVICE, path, f"{fingerprint}|{key.decode()}")
+        except keyring.errors.KeyringError as error:
+            _warn_no_keyring(f"The system keyring is unavailable ({error})")
+    return key
+
+def forget_key(file_path: str = None) -> bool:
+    """ Drops a cached key (or every in-process key if no file is given) and removes it from the keyring.
+    Returns False if there is no usable keyring to remove it from. """
+    if file_path is None:
+        _key_cache.clear()
+        return True
+    path = os.path.realpath(file_path)
+    _key_cache.pop(path, None)
+    keyring = _keyring()
+    if keyring is None:
+        return False
+    try:
+        if keyring.get_password(KEYRING_SERVICE, path) is not None:
+            keyring.delete_password(KEYRING_SERVICE, path)
+    except keyring.errors.KeyringError:
+        return False
+    return True
 
 # Encrypt and Decrypt Password
+@functools.lru_cache(maxsize=4)
+def get_fernet(key: bytes):
+    """ Returns a Fernet instance for the key, reused across calls """
+    with profiler.phase('import'):
+        from cryptography.fernet import Fernet  # Imported lazily to keep agent client start-up cheap
+    return Fernet(key)
+
 def encrypt_password(key: bytes, password: str) -> str:
-    f = Fernet(key)
-    encrypted = f.encrypt(password.encode())
+    f = get_fernet(key)
+    with profiler.phase('encrypt'):
+        encrypted = f.encrypt(password.encode())
     return encrypted.decode()
 
 def decrypt_password(key: bytes, encrypted_password: str) -> str:
-    f = Fernet(key)
-    decrypted = f.decrypt(encrypted_password.encode())
+    f = get_fernet(key)
+    with profiler.phase('decrypt'):
+        decrypted = f.decrypt(encrypted_password.encode())
     return decrypted.decode()
 
-# Suggest a complicated password using random characters.
+def _parse_json(text: str):
+    with profiler.phase('json parse'):
+        return json.loads(text)
+
+# Suggest complicated passwords using cryptographically secure random characters.
+CHARACTER_CLASSES = {
+    'lower': 'abcdefghijklmnopqrstuvwxyz',
+    'upper': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'digits': '1234567890',
+    'symbols': '!@#$%^&*()_+',
+}
+
+@functools.lru_cache(maxsize=16)
+def _alphabet_tables(classes: tuple):
+    """ Returns the byte translation table and rejected bytes for an alphabet """
+    alphabet = ''.join(CHARACTER_CLASSES[name] for name in CHARACTER_CLASSES if name in classes).encode()
+    limit = 256 - 256 % len(alphabet)
+    table = bytes(alphabet[value % len(alphabet)] for value in range(256))
+    return table, bytes(range(limit, 256))
+
+class _CharacterStream:
+    """ Uniformly random characters from an alphabet, drawn from os.urandom in batches """
+    def __init__(self, classes: tuple, batch: int):
+        self.table, self.rejected = _alphabet_tables(classes)
+        self.batch = batch
+        self.pool = b''
+        self.position = 0
+
+    def take(self, count: int) -> bytes:
+        while len(self.pool) - self.position < count:
+            fresh = os.urandom(max(self.batch, count * 2)).translate(self.table, self.rejected)
+            self.pool = self.pool[self.position:] + fresh
+            self.position = 0
+        start = self.position
+        self.position += count
+        return self.pool[start:self.position]
+
+def generate_passwords(count: int, length=16, classes=tuple(CHARACTER_CLASSES), min_digits=0, min_symbols=0):
+    """ Yields count random passwords drawn from the given character classes.
+
+    Random bytes are fetched from os.urandom in batches and mapped onto the
+    alphabet with a translation table. Bytes at or above the largest multiple
+    of the alphabet size are discarded so every character is equally likely.
+    The required digits and symbols are drawn from their own classes, the
+    rest from the full alphabet, and the result is shuffled with secrets.
+    The arguments are checked on the call, before any password is drawn.
+    """
+    unknown = set(classes) - set(CHARACTER_CLASSES)
+    if not classes:
+        raise ValueError("At least one character class is required.")
+    if unknown:
+        raise ValueError(f"Unknown character classes: {', '.join(sorted(unknown))}")
+    if length < 1:
+        raise ValueError("Password length must be at least 1.")
+    if min_digits < 0 or min_symbols < 0:
+        raise ValueError("min_digits and min_symbols cannot be negative.")
+    if min_digits + min_symbols > length:
+        raise ValueError("min_digits and min_symbols cannot add up to more than the password length.")
+    if (min_digits and 'digits' not in classes) or (min_symbols and 'symbols' not in classes):
+        raise ValueError("Minimum digits or symbols require those character classes.")
+    return _generate_passwords(count, length, classes, min_digits, min_symbols)
+
+def _generate_passwords(count: int, length: int, classes, min_digits: int, min_symbols: int):
+    passwords = min(count, 4096)
+    free = length - min_digits - min_symbols
+    characters = _CharacterStream(tuple(sorted(set(classes))), passwords * max(free, 1) * 2)
+    if not (min_digits or min_symbols):
+        for _ in range(count):
+            yield characters.take(length).decode()
+        return
+    digits = _CharacterStream(('digits',), passwords * max(min_digits, 1) * 2)
+    symbols = _CharacterStream(('symbols',), passwords * max(min_symbols, 1) * 2)
+    for _ in range(count):
+        password = characters.take(free) + digits.take(min_digits) + symbols.take(min_symbols)
+        # Shuffle by sorting on random 64-bit keys: one secrets call per password instead of one per character
+        keys = memoryview(secrets.token_bytes(8 * length)).cast('Q').tolist()
+        yield bytes([password[i] for i in sorted(range(length), key=keys.__getitem__)]).decode()
+
 def suggest_password(length=16):
-    characters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890!@#$%^&*()_+'
-    password = ''.join(random.choice(characters) for _ in range(length))
-    return password
+    return next(generate_passwords(1, length))
+
+def write_passwords(path: str, passwords) -> int:
+    """ Streams passwords to a file readable only by the owner, one per line """
+    count = 0
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    if hasattr(os, 'fchmod'):
+        os.fchmod(fd, 0o600)  # The mode above only applies to newly created files
+    with open(fd, 'w') as file:
+        for password in passwords:
+            file.write(password + '\n')
+            count += 1
+    return count
+
+# Import and Export Rows
+ROW_FIELDS = ('service', 'account', 'password')
+
+def _is_csv(path: str) -> bool:
+    return path.lower().endswith('.csv')
+
+def read_rows(path: str):
+    """ Yields (service, account, password) rows from a UTF-8 CSV or JSONL file, with or without a BOM """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        if _is_csv(path):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                raise ValueError(f"Row {number} of {path} is not an object.")
+            service, account, password = (row.get(field) for field in ROW_FIELDS)
+            if not all(isinstance(value, str) and value for value in (service, account, password)):
+                raise ValueError(f"Row {number} of {path} needs service, account, and password strings.")
+            yield service, account, password
+
+def write_rows(path: str, rows):
+    """ Streams (service, account, password) rows to a new CSV or JSONL file readable only by the owner """
+    count = 0
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)  # Never reuse a file others may read
+    except FileExistsError:
+        raise ValueError(f"{path} already exists.") from None
+    with open(fd, 'w', encoding='utf-8', newline='') as file:
+        if _is_csv(path):
+            writer = csv.writer(file)
+            writer.writerow(ROW_FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(dict(zip(ROW_FIELDS, row))) + '\n')
+                count += 1
+    return count
+
+# Per-Record Vault File
+VAULT_MAGIC = b'FELINESECURE-VAULT 2\n'
+TOMBSTONE = b'-'
+COMPACT_MIN_DEAD = 1024  # Don't bother compacting small vaults
+INDEX_MAGIC = b'FSIDX\x00\x00\x02'
+INDEX_HEADER = struct.Struct('<8sQQQQ32s')  # magic, vault inode, covered size, lines, live records, checksum
+INDEX_ENTRY = struct.Struct('<16sQ')  # record id, byte offset
+INDEX_TAIL_MAX = 1024  # Unindexed lines tolerated before the index is rebuilt
+
+def _acquire_lock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:  # LK_LOCK gives up after ten seconds
+            continue
+
+def _release_lock(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _fsync_directory(path: str):
+    """ Flushes the directory entry for path, so a new or replaced file survives a crash """
+    if not hasattr(os, 'O_DIRECTORY'):  # Windows cannot open directories for fsync
+        return
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+def record_id(key: bytes, service: str, account: str) -> str:
+    """ Derives a stable, non-reversible identifier for a service/account pair """
+    id_key = hashlib.sha256(b'felinesecure-record-id' + key).digest()
+    label = f"{service}\0{account}".encode()
+    return hmac.new(id_key, label, hashlib.sha256).hexdigest()[:32]
+
+# Storage Backends
+class VaultBackend(abc.ABC):
+    """ Storage for encrypted records, keyed by record id.
+
+    PasswordManager only ever sees (record id, label token, secret token)
+    entries, so backends never handle plaintext. Subclasses implement the
+    abstract methods and the `live` count of stored records; the rest have
+    sensible defaults.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.generation = 0  # Bumped whenever refresh() notices changes made by another process
+
+    @abc.abstractmethod
+    def open(self):
+        """ Opens the storage, creating it on first write if it does not exist """
+
+    @abc.abstractmethod
+    def close(self):
+        """ Releases the storage; open() may be called again afterwards """
+
+    @property
+    @abc.abstractmethod
+    def live(self) -> int:
+        """ Number of live records """
+
+    def refresh(self):
+        """ Picks up changes other processes made since the vault was opened """
+
+    @contextlib.contextmanager
+    def locked(self):
+        """ Serialises a read-modify-write sequence against other writers """
+        yield
+
+    def is_legacy(self) -> bool:
+        """ True if the storage holds a format that must be migrated before opening """
+        return False
+
+    @abc.abstractmethod
+    def lookup(self, rid: str):
+        """ Returns a non-None value if the record is live """
+
+    @abc.abstractmethod
+    def read(self, rid: str):
+        """ Returns the (label token, secret token) pair of a record, or None """
+
+    @abc.abstractmethod
+    def entries(self):
+        """ Yields the (record id, label token, secret token) entry of every live record """
+
+    def records(self):
+        """ Yields the (label token, secret token) pair of every live record """
+        for _, label_token, secret_token in self.entries():
+            yield label_token, secret_token
+
+    @abc.abstractmethod
+    def append(self, entries):
+        """ Stores (record id, label token, secret token) entries in one transaction.
+        A secret token of None deletes the record. """
+
+    @abc.abstractmethod
+    def rewrite(self, entries):
+        """ Atomically replaces every record with the given entries """
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def compact(self):
+        """ Reclaims space left by superseded or deleted records """
+
+class VaultFile(VaultBackend):
+    """ Append-only file of individually encrypted records.
+
+    Each line is "<record id> <label token> <secret token>", where the label
+    token holds the encrypted service/account pair and the secret token the
+    encrypted password. Deletes append "<record id> -". The latest line for a
+    record id wins; compaction drops the superseded lines.
+
+    A sidecar "<vault>.idx" file maps record ids to line offsets, sorted so it
+    can be binary searched straight from a memory map. Lines appended after
+    the index was written (the tail) are scanned on open and kept in memory
+    until there are enough of them to be worth folding into the index.
+
+    Writers hold an advisory lock on "<vault>.lock" and, before writing,
+    pick up whatever other processes appended (or reopen the vault if it
+    was compacted) so concurrent writers never drop each other's records.
+    Appends are fsynced and whole-file rewrites go through a temporary file
+    and os.replace, with the directory fsynced after either creates or
+    replaces the file, so a crash leaves at most a torn last line, which is
+    ignored on read and truncated by the next writer.
+    """
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.index_path = path + '.idx'
+        self.lock_path = path + '.lock'
+        self.tail = {}  # record id -> byte offset of its latest unindexed line, None if deleted
+        self.tail_lines = 0
+        self.lines = 0
+        self._live = 0
+        self.size = 0
+        self._covered = 0
+        self._index_count = 0
+        self._inode = None
+        self._map = None
+        self._index_map = None
+        self._lock_file = None
+        self._lock_depth = 0
+
+    @property
+    def live(self) -> int:
+        return self._live
+
+    @property
+    def dead_records(self) -> int:
+        return self.lines - self._live
+
+    def is_legacy(self) -> bool:
+        """ True if the file holds a pre-record, single-blob vault """
+        with open(self.path, 'rb') as file:
+            head = file.read(len(VAULT_MAGIC))
+        return bool(head) and head != VAULT_MAGIC
+
+    @contextlib.contextmanager
+    def locked(self):
+        """ Holds the vault's advisory write lock; re-entrant within a process """
+        if self._lock_depth == 0:
+            self._lock_file = open(self.lock_path, 'a+b')
+            _acquire_lock(self._lock_file)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                _release_lock(self._lock_file)
+                self._lock_file.close()
+                self._lock_file = None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+
+    def open(self):
+        """ Maps the vault and its index, rebuilding the index if it is missing or stale """
+        with profiler.phase('vault open'):
+            self._open()
+
+    def _open(self):
+        self.close()
+        self.tail = {}
+        self.tail_lines = self.lines = self._live = self.size = 0
+        self._covered = self._index_count = 0
+        self._inode = None
+        if not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) == 0:
+            self._inode = os.stat(self.path).st_ino
+            return
+        self._map_vault()
+        if self._map[:len(VAULT_MAGIC)] != VAULT_MAGIC:
+            raise ValueError(f"{self.path} is not a record vault")
+        if self._load_index():
+            self._scan_tail(self._covered)
+        else:
+            self._covered = len(VAULT_MAGIC)
+            self._scan_tail(self._covered)
+            with self.locked():
+                self.rebuild_index()
+
+    def refresh(self):
+        """ Picks up records other processes appended, or reopens the vault if it was replaced """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_ino != self._inode:
+            if stat is not None or self._inode is not None:
+                self.generation += 1
+            self.open()
+        elif stat.st_size > self.size:
+            lines = self.lines
+            self._map_vault()
+            if self._inode != stat.st_ino:
+                self.open()  # Replaced between the stat and the map
+            else:
+                self._scan_tail(self.size)
+            if self.lines != lines or self._inode != stat.st_ino:
+                self.generation += 1
+
+    def _map_vault(self):
+        if self._map is not None:
+            self._map.close()
+        with open(self.path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._inode = os.fstat(file.fileno()).st_ino
+
+    def _checksum(self, covered: int) -> bytes:
+        return hashlib.sha256(self._map[max(0, covered - 64):covered]).digest()
+
+    def _load_index(self) -> bool:
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) < INDEX_HEADER.size:
+            return False
+        with open(self.index_path, 'rb') as file:
+            index_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, inode, covered, lines, live, checksum = INDEX_HEADER.unpack_from(index_map)
+        count, remainder = divmod(len(index_map) - INDEX_HEADER.size, INDEX_ENTRY.size)
+        if (magic != INDEX_MAGIC or remainder or count != live
+                or inode != self._inode or covered > len(self._map)
+                or checksum != self._checksum(covered)):
+            index_map.close()
+            return False
+        self._index_map = index_map
+        self._index_count = count
+        self._covered = covered
+        self.lines = lines
+        self._live = live
+        return True
+
+    def _index_lookup(self, rid: bytes):
+        low, high = 0, self._index_count
+        while low < high:
+            middle = (low + high) // 2
+            entry_rid, offset = INDEX_ENTRY.unpack_from(self._index_map, INDEX_HEADER.size + middle * INDEX_ENTRY.size)
+            if entry_rid < rid:
+                low = middle + 1
+            elif entry_rid > rid:
+                high = middle
+            else:
+                return offset
+        return None
+
+    def lookup(self, rid: str):
+        """ Returns the byte offset of a record's latest line, or None if it is not live """
+        if rid in self.tail:
+            return self.tail[rid]
+        if not self._index_count:
+            return None
+        return self._index_lookup(bytes.fromhex(rid))
+
+    def _apply(self, rid: str, offset):
+        was_live = self.lookup(rid) is not None
+        self.tail[rid] = offset
+        self.tail_lines += 1
+        self.lines += 1
+        self._live += (offset is not None) - was_live
+
+    def _scan_tail(self, offset: int):
+        while True:
+            end = self._map.find(b'\n', offset)
+            if end == -1:
+                break  # Ignore a torn trailing line
+            rid, _, rest = self._map[offset:end].partition(b' ')
+            self._apply(rid.decode(), None if rest == TOMBSTONE else offset)
+            offset = end + 1
+        self.size = offset
+
+    def _index_entries(self):
+        for position in range(self._index_count):
+            yield INDEX_ENTRY.unpack_from(self._index_map, INDEX_HEADER.size + position * INDEX_ENTRY.size)
+
+    def _live_entries(self):
+        """ Yields (record id bytes, offset) for every live record, sorted by record id """
+        tail = sorted((bytes.fromhex(rid), offset) for rid, offset in self.tail.items())
+        merged = heapq.merge(
+            ((rid, 0, offset) for rid, offset in self._index_entries()),
+            ((rid, 1, offset) for rid, offset in tail),
+        )
+        pending = None
+        for rid, _, offset in merged:
+            if pending is not None and pending[0] != rid and pending[1] is not None:
+                yield pending
+            pending = (rid, offset)  # The tail sorts after the index, so it wins
+        if pending is not None and pending[1] is not None:
+            yield pending
+
+    def rebuild_index(self):
+        """ Folds the tail into a freshly written index covering the whole file """
+        tmp_path = self.index_path + '.tmp'
+        with profiler.phase('write'), open(tmp_path, 'wb') as file:
+            file.write(INDEX_HEADER.pack(
+                INDEX_MAGIC, self._inode, self.size, self.lines, self._live, self._checksum(self.size)
+            ))
+            for rid, offset in self._live_entries():
+                file.write(INDEX_ENTRY.pack(rid, offset))
+            file.flush()
+            os.fsync(file.fileno())
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+        os.replace(tmp_path, self.index_path)
+        _fsync_directory(self.index_path)
+        self.tail = {}
+        self.tail_lines = 0
+        self._load_index()
+
+    def _read_at(self, offset: int):
+        end = self._map.find(b'\n', offset)
+        _, label_token, secret_token = self._map[offset:end].split()
+        return label_token.decode(), secret_token.decode()
+
+    def read(self, rid: str):
+        """ Returns the (label token, secret token) pair of a record, or None """
+        offset = self.lookup(rid)
+        if offset is None:
+            return None
+        return self._read_at(offset)
+
+    def entries(self):
+        for rid, offset in self._live_entries():
+            yield (rid.hex(), *self._read_at(offset))
+
+    def append(self, entries):
+        """ Appends (record id, label token, secret token) entries in one write.
+        A secret token of None marks the record as deleted. """
+        entries = list(entries)
+        if not entries:
+            return
+        with self.locked():
+            self.refresh()
+            with profiler.phase('write'):
+                self._append_locked(entries)
+            if self.tail_lines >= INDEX_TAIL_MAX:
+                self.rebuild_index()
+
+    def _append_locked(self, entries):
+        chunks = []
+        offset = self.size or len(VAULT_MAGIC)
+        pending = []
+        for rid, label_token, secret_token in entries:
+            if secret_token is None:
+                line = f"{rid} -\n".encode()
+                pending.append((rid, None))
+            else:
+                line = f"{rid} {label_token} {secret_token}\n".encode()
+                pending.append((rid, offset))
+            chunks.append(line)
+            offset += len(line)
+        with open(self.path, 'ab') as file:
+            if self.size == 0:
+                file.truncate(0)
+                file.write(VAULT_MAGIC)
+                self._covered = len(VAULT_MAGIC)
+            elif file.tell() != self.size:
+                file.truncate(self.size)  # Drop a torn write from an earlier crash
+            file.write(b''.join(chunks))
+            file.flush()
+            os.fsync(file.fileno())
+        if self.size == 0:
+            _fsync_directory(self.path)  # The file may have just been created
+        self._map_vault()
+        for rid, record_offset in pending:
+            self._apply(rid, record_offset)
+        self.size = offset
+
+    def rewrite(self, entries):
+        """ Atomically replaces the file with the given (record id, label token, secret token) entries """
+        with self.locked():
+            tmp_path = self.path + '.tmp'
+            with profiler.phase('write'), open(tmp_path, 'wb') as file:
+                file.write(VAULT_MAGIC)
+                for rid, label_token, secret_token in entries:
+                    file.write(f"{rid} {label_token} {secret_token}\n".encode())
+                file.flush()
+                os.fsync(file.fileno())
+            self.close()
+            os.replace(tmp_path, self.path)
+            _fsync_directory(self.path)
+            self.open()
+
+    def compact(self):
+        """ Rewrites the file without superseded or deleted records """
+        with self.locked():
+            self.refresh()
+            self.rewrite(self.entries())
+
+    def needs_compaction(self) -> bool:
+        return self.dead_records >= COMPACT_MIN_DEAD and self.dead_records > self._live
+
+class SQLiteVault(VaultBackend):
+    """ SQLite database holding one row per encrypted record.
+
+    Rows are keyed by record id (the HMAC of service and account), so
+    lookups use the primary key index without storing names in the clear.
+    The database runs in WAL mode so readers never block the writer, and
+    every append or rewrite is a single transaction. SQLite does its own
+    locking, so locked() has nothing to add.
+    """
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._connection = None
+        self._data_version = None
+
+    def open(self):
+        self.close()
+        with profiler.phase('vault open'):
+            try:
+                self._open()
+            except sqlite3.DatabaseError as error:  # Also raised for files that are not databases
+                self.close()
+                raise ValueError(f"{self.path} is not a usable SQLite vault: {error}") from None
+
+    def _open(self):
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS records (id TEXT PRIMARY KEY, label TEXT NOT NULL, secret TEXT NOT NULL)'
+                ' WITHOUT ROWID'
+            )
+        self._data_version = self._connection.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def refresh(self):
+        data_version = self._connection.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self.generation += 1
+
+    @property
+    def live(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def lookup(self, rid: str):
+        row = self._connection.execute('SELECT 1 FROM records WHERE id = ?', (rid,)).fetchone()
+        return None if row is None else row[0]
+
+    def read(self, rid: str):
+        return self._connection.execute('SELECT label, secret FROM records WHERE id = ?', (rid,)).fetchone()
+
+    def entries(self):
+        yield from self._connection.execute('SELECT id, label, secret FROM records')
+
+    def append(self, entries):
+        with profiler.phase('write'), self._connection:
+            for rid, label_token, secret_token in entries:
+                if secret_token is None:
+                    self._connection.execute('DELETE FROM records WHERE id = ?', (rid,))
+                else:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO records (id, label, secret) VALUES (?, ?, ?)',
+                        (rid, label_token, secret_token),
+                    )
+
+    def rewrite(self, entries):
+        with profiler.phase('write'), self._connection:
+            self._connection.execute('DELETE FROM records')
+            self._connection.executemany('INSERT OR REPLACE INTO records (id, label, secret) VALUES (?, ?, ?)', entries)
+
+    def compact(self):
+        self._connection.execute('VACUUM')
+
+DEFAULT_VAULT = 'passwords.json'
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+def open_backend(uri: str) -> VaultBackend:
+    """ Returns the (unopened) backend for a vault path or URI.
+
+    "sqlite:PATH" (or "sqlite:///PATH") selects SQLite and "file:PATH" the
+    record file. Plain paths use SQLite if they end in .db, .sqlite or
+    .sqlite3 and the record file otherwise.
+    """
+    scheme, separator, path = uri.partition(':')
+    if separator and scheme in ('sqlite', 'file'):
+        if path.startswith('//'):
+            path = path[2:]
+        return SQLiteVault(path) if scheme == 'sqlite' else VaultFile(path)
+    if uri.lower().endswith(SQLITE_SUFFIXES):
+        return SQLiteVault(uri)
+    return VaultFile(uri)
+
+# Name Search
+SEARCH_LIMIT = 50
+SCAN_RATIO = 4  # Scan the sorted names once the rarest trigram is in more than 1/SCAN_RATIO of them
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _prefixed(keys: list, pattern: str, exact: bool = False):
+    """ Yields the entries of a sorted key list whose first field starts with (or equals) pattern """
+    for position in range(bisect.bisect_left(keys, (pattern,)), len(keys)):
+        key = keys[position][0]
+        if key != pattern and (exact or not key.startswith(pattern)):
+            return
+        yield keys[position]
+
+class NameIndex:
+    """ In-memory index over service and account names.
+
+    Lowercase names are kept in sorted lists, so exact and prefix matches
+    are a binary search away and come out already in order, and in trigram
+    posting sets for substring and fuzzy matches. Services are indexed once
+    however many accounts they hold. Passwords are never touched.
+    """
+    def __init__(self, names=()):
+        self.accounts = {}  # service -> set of accounts
+        self.service_keys = []  # sorted (lowercase service, service)
+        self.account_keys = []  # sorted (lowercase account, service, account)
+        self.pairs = []  # pair id -> (service, account), None once removed
+        self.pair_ids = {}  # (service, account) -> pair id
+        self.service_grams = collections.defaultdict(set)  # trigram -> set of services
+        self.account_grams = collections.defaultdict(set)  # trigram -> set of pair ids
+        for service, account in names:
+            self._index(service, account, insort=False)
+        self.service_keys.sort()
+        self.account_keys.sort()
+
+    def __len__(self) -> int:
+        return len(self.account_keys)
+
+    def _index(self, service: str, account: str, insort: bool):
+        add_key = bisect.insort if insort else list.append
+        accounts = self.accounts.get(service)
+        if accounts is None:
+            accounts = self.accounts[service] = set()
+            add_key(self.service_keys, (service.lower(), service))
+            for gram in _trigrams(service.lower()):
+                self.service_grams[gram].add(service)
+        elif account in accounts:
+            return
+        accounts.add(account)
+        add_key(self.account_keys, (account.lower(), service, account))
+        pair_id = len(self.pairs)
+        self.pairs.append((service, account))
+        self.pair_ids[(service, account)] = pair_id
+        for gram in _trigrams(account.lower()):
+            self.account_grams[gram].add(pair_id)
+
+    def add(self, service: str, account: str):
+        self._index(service, account, insort=True)
+
+    def remove(self, service: str, account: str):
+        accounts = self.accounts.get(service)
+        if accounts is None or account not in accounts:
+            return
+        accounts.remove(account)
+        key = (account.lower(), service, account)
+        del self.account_keys[bisect.bisect_left(self.account_keys, key)]
+        pair_id = self.pair_ids.pop((service, account))
+        self.pairs[pair_id] = None
+        for gram in _trigrams(account.lower()):
+            self.account_grams[gram].discard(pair_id)
+        if not accounts:
+            del self.accounts[service]
+            key = (service.lower(), service)
+            del self.service_keys[bisect.bisect_left(self.service_keys, key)]
+            for gram in _trigrams(service.lower()):
+                self.service_grams[gram].discard(service)
+
+    def listing(self):
+        """ Returns every (service, account) pair, sorted case-insensitively like search results """
+        by_service = collections.defaultdict(list)
+        for _, service, account in self.account_keys:  # Already in lowercase account order
+            by_service[service].append(account)
+        return [(service, account) for _, service in self.service_keys for account in by_service[service]]
+
+    def _expand(self, services):
+        for service in services:
+            for account in sorted(self.accounts[service], key=lambda account: (account.lower(), account)):
+                yield service, account
+
+    @staticmethod
+    def _containing(keys: list, grams: dict, pattern: str, key_of):
+        """ Yields the entries of a sorted key list whose first field contains pattern, in order.
+
+        Rare patterns are looked up through their trigram postings and only
+        the survivors are ordered; common ones are found by walking the
+        sorted keys, which the caller stops as soon as it has enough.
+        """
+        postings = sorted((grams.get(gram, set()) for gram in _trigrams(pattern)), key=len)
+        if len(postings[0]) * SCAN_RATIO > len(keys):
+            yield from (key for key in keys if pattern in key[0])
+            return
+        matches = [key for key in map(key_of, postings[0].intersection(*postings[1:])) if pattern in key[0]]
+        heapq.heapify(matches)
+        while matches:
+            yield heapq.heappop(matches)
+
+    def _matches(self, pattern: str):
+        """ Yields (service, account) pairs matching pattern in rank order, possibly repeating """
+        yield from self._expand(service for _, service in _prefixed(self.service_keys, pattern, exact=True))
+        yield from ((service, account) for _, service, account in _prefixed(self.account_keys, pattern, exact=True))
+        yield from self._expand(service for _, service in _prefixed(self.service_keys, pattern))
+        yield from ((service, account) for _, service, account in _prefixed(self.account_keys, pattern))
+        if len(pattern) < 3:
+            return
+        services = self._containing(self.service_keys, self.service_grams, pattern,
+                                    lambda service: (service.lower(), service))
+        yield from self._expand(service for _, service in services)
+        accounts = self._containing(self.account_keys, self.account_grams, pattern,
+                                    lambda pair_id: (self.pairs[pair_id][1].lower(), *self.pairs[pair_id]))
+        yield from ((service, account) for _, service, account in accounts)
+
+    def _fuzzy(self, pattern: str, limit: int):
+        """ Returns names sharing at least half of pattern's trigrams, most shared first """
+        grams = _trigrams(pattern)
+        threshold = (len(grams) + 1) // 2
+        scored = []
+        for index, kind in ((self.service_grams, 0), (self.account_grams, 1)):
+            postings = sorted((index.get(gram, set()) for gram in grams), key=len)
+            # A name sharing threshold trigrams must be in one of the rarest len - threshold + 1 postings
+            candidates = set().union(*postings[:len(postings) - threshold + 1])
+            for name in candidates:
+                count = sum(name in posting for posting in postings)
+                if count >= threshold:
+                    if kind:
+                        name = self.pairs[name]
+                    scored.append((-count, kind, name[1].lower() if kind else name.lower(), name))
+        for _, kind, _, name in heapq.nsmallest(limit, scored):
+            if kind:
+                yield name
+            else:
+                yield from self._expand([name])
+
+    def search(self, pattern: str, limit: int = SEARCH_LIMIT):
+        """ Returns up to limit (service, account) pairs matching pattern, best matches first.
+
+        Exact names rank first, then prefixes, then substrings, with services
+        ahead of accounts at each level. Patterns under three characters only
+        match prefixes. If nothing contains the pattern, names sharing at
+        least half of its trigrams are returned as fuzzy matches.
+        """
+        pattern = pattern.lower()
+        if not pattern or limit < 1:
+            return []
+        results = {}  # Insertion-ordered set
+        for name in self._matches(pattern):
+            results[name] = None
+            if len(results) >= limit:
+                break
+        if not results and len(pattern) >= 3:
+            for name in self._fuzzy(pattern, limit):
+                results[name] = None
+                if len(results) >= limit:
+                    break
+        return list(results)
+
+def encrypt_record(key: bytes, service: str, account: str, password: str):
+    """ Returns the (record id, label token, secret token) entry for a credential """
+    with profiler.phase('json serialize'):
+        label = json.dumps([service, account])
+    label_token = encrypt_password(key, label)
+    return record_id(key, service, account), label_token, encrypt_password(key, password)
 
 # Password Manager Class
 class PasswordManager:
     def __init__(self, storage_file: str, key: bytes):
         self.storage_file = storage_file
         self.key = key
-        self.passwords = self.load_passwords()
+        self.vault = open_backend(storage_file)
+        if os.path.exists(self.vault.path) and self.vault.is_legacy():
+            with self.vault.locked():
+                if self.vault.is_legacy():  # Another process may have migrated it meanwhile
+                    self.migrate_legacy()
+        self.vault.open()
+        self._names = None
+        self._names_generation = None
+
+    @classmethod
+    def from_key_file(cls, storage_file: str, key_file: str, use_keyring: bool = False):
+        """ Opens a vault with the key derived from key_file, reusing a cached key when possible """
+        return cls(storage_file, load_key(key_file, use_keyring))
         
+    def iter_passwords(self):
+        """ Yields (service, account, password) for every record, decrypting one at a time """
+        for label_token, secret_token in self.vault.records():
+            service, account = _parse_json(decrypt_password(self.key, label_token))
+            yield service, account, decrypt_password(self.key, secret_token)
+
+    def iter_accounts(self):
+        """ Yields (service, account) for every record without decrypting any password """
+        for label_token, _ in self.vault.records():
+            service, account = _parse_json(decrypt_password(self.key, label_token))
+            yield service, account
+
+    @property
+    def names(self) -> NameIndex:
+        """ The name index, built on first use and rebuilt if another process changed the vault """
+        self.vault.refresh()
+        if self._names is None or self._names_generation != self.vault.generation:
+            self._names = NameIndex(self.iter_accounts())
+            self._names_generation = self.vault.generation
+        return self._names
+
+    def list_accounts(self):
+        """ Returns every (service, account) pair, sorted """
+        return self.names.listing()
+
+    def search(self, pattern: str, limit: int = SEARCH_LIMIT):
+        """ Returns (service, account) pairs whose names match pattern, best matches first """
+        return self.names.search(pattern, limit)
+
     def load_passwords(self):
-        if not os.path.exists(self.storage_file):
-            return {}
-        with open(self.storage_file, 'r') as file:
+        """ Decrypts the whole vault into a {service: {account: password}} dict """
+        passwords = {}
+        for service, account, password in self.iter_passwords():
+            passwords.setdefault(service, {})[account] = password
+        return passwords
+
+    def migrate_legacy(self):
+        """ Converts a single-blob vault to the per-record format, keeping a .bak copy """
+        with open(self.vault.path, 'r') as file:
             encrypted_data = file.read()
-        if not encrypted_data:
-            return {}
-        decrypted_data = decrypt_password(self.key, encrypted_data)
-        return json.loads(decrypted_data)
-    
-    def save_passwords(self):
-        encrypted_data = encrypt_password(self.key, json.dumps(self.passwords))
-        with open(self.storage_file, 'w') as file:
-            file.write(encrypted_data)
+        passwords = _parse_json(decrypt_password(self.key, encrypted_data))
+        shutil.copy2(self.vault.path, self.vault.path + '.bak')
+        self.save_passwords(passwords)  # Swapped in with os.replace, so the blob survives a failed write
+
+    def save_passwords(self, passwords: dict):
+        """ Re-encrypts every record and rewrites the vault in one go """
+        self.vault.rewrite(
+            encrypt_record(self.key, service, account, password)
+            for service, accounts in passwords.items()
+            for account, password in accounts.items()
+        )
+
+    def _compact_if_needed(self):
+        if self.vault.needs_compaction():
+            with self.vault.locked():
+                self.vault.refresh()
+                if self.vault.needs_compaction():
+                    self.vault.compact()
             
     def add_password(self, service: str, account: str, password: str):
-        if service not in self.passwords:
-            self.passwords[service] = {}
-        self.passwords[service][account] = password
-        self.save_passwords()
+        self.vault.append([encrypt_record(self.key, service, account, password)])
+        if self._names is not None:
+            self._names.add(service, account)
+        self._compact_if_needed()
         
+    def import_passwords(self, rows) -> int:
+        """ Encrypts (service, account, password) rows and appends them in a single write.
+        Nothing is written if any row is rejected. """
+        records, names = [], []
+        for service, account, password in rows:
+            records.append(encrypt_record(self.key, service, account, password))
+            names.append((service, account))
+        self.vault.append(records)
+        if self._names is not None:
+            for service, account in names:
+                self._names.add(service, account)
+        self._compact_if_needed()
+        return len(records)
+
+    def export_passwords(self, path: str, export_key: bytes = None) -> int:
+        """ Streams every record to a CSV/JSONL file, or to a new vault encrypted with export_key """
+        if export_key is None:
+            if self._is_source(path):
+                raise ValueError(f"{path} is the source vault.")
+            return write_rows(path, self.iter_passwords())
+        exported = self._open_empty_target(path)
+        try:
+            exported.rewrite(encrypt_record(export_key, *row) for row in self.iter_passwords())
+            return exported.live
+        finally:
+            exported.close()
+
+    def migrate_to(self, uri: str) -> int:
+        """ Copies every encrypted record into an empty vault at uri, possibly on another backend """
+        target = self._open_empty_target(uri)
+        try:
+            target.rewrite(self.vault.entries())
+            return target.live
+        finally:
+            target.close()
+
+    def _is_source(self, uri: str) -> bool:
+        return os.path.realpath(open_backend(uri).path) == os.path.realpath(self.vault.path)
+
+    def _open_empty_target(self, uri: str) -> VaultBackend:
+        """ Opens the vault at uri, refusing this vault, legacy vaults and vaults that already hold records """
+        if self._is_source(uri):
+            raise ValueError(f"{uri} is the source vault.")
+        target = open_backend(uri)
+        if os.path.exists(target.path) and target.is_legacy():
+            raise ValueError(f"{uri} holds a legacy vault; open it once to migrate it first.")
+        target.open()
+        if target.live:
+            target.close()
+            raise ValueError(f"{uri} already holds records.")
+        return target
+
     def get_password(self, service: str, account: str):
-        return self.passwords.get(service, {}).get(account)
+        self.vault.refresh()
+        record = self.vault.read(record_id(self.key, service, account))
+        if record is None:
+            return None
+        return decrypt_password(self.key, record[1])
     
     def delete_password(self, service: str, account: str):
-        if service in self.passwords and account in self.passwords[service]:
-            del self.passwords[service][account]
-            if not self.passwords[service]:  # If no accounts left for the service, remove the service
-                del self.passwords[service]
-            self.save_passwords()
+        rid = record_id(self.key, service, account)
+        with self.vault.locked():
+            self.vault.refresh()
+            if self.vault.lookup(rid) is not None:
+                self.vault.append([(rid, None, None)])
+        if self._names is not None:
+            self._names.remove(service, account)
+        self._compact_if_needed()
 
-def main():
-    parser = argparse.ArgumentParser(description='Password Manager')
-    parser.add_argument('--key-file', required=True, help='Path to the master key file')
-    parser.add_argument('--add', action='store_true', help='Add a password for an account')
-    parser.add_argument('--get', action='store_true', help='Get a password for an account')
-    parser.add_argument('--delete', action='store_true', help='Delete a password for an account')
-    parser.add_argument('--suggest', action='store_true', help='Suggest a random password')
-    parser.add_argument('--service', help='The service for which the action is performed')
-    parser.add_argument('--account', help='The account for which the action is performed')
-    parser.add_argument('--password', help='The password to add for an account')
-    parser.add_argument('--length', type=int, help='Length of the suggested password')
+# Vault Agent
+DEFAULT_AGENT_SOCKET = os.environ.get('FELINESECURE_AGENT_SOCKET') or os.path.join(
+    os.path.expanduser('~'), '.felinesecure', 'agent.sock'
+)
+DEFAULT_IDLE_TIMEOUT = 900  # Seconds without requests before the agent locks itself
 
-    args = parser.parse_args()
+class AgentError(Exception):
+    """ Raised when the vault agent rejects a request """
 
-    key = generate_key(args.key_file)
-    manager = PasswordManager('passwords.json', key)
+class AgentClient:
+    """ Forwards PasswordManager calls to a running vault agent """
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.responses = sock.makefile('rb')
 
+    @classmethod
+    def connect(cls, socket_path: str = DEFAULT_AGENT_SOCKET):
+        """ Returns a client for the agent listening on socket_path, or None if none is running """
+        if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock)
+
+    def close(self):
+        self.responses.close()
+        self.sock.close()
+
+    def request(self, action: str, **params):
+        self.sock.sendall(json.dumps(dict(params, action=action)).encode() + b'\n')
+        line = self.responses.readline()
+        if not line:
+            raise AgentError("The vault agent closed the connection")
+        response = json.loads(line)
+        if not response['ok']:
+            raise AgentError(response['error'])
+        return response.get('result')
+
+    def add_password(self, service: str, account: str, password: str):
+        self.request('add', service=service, account=account, password=password)
+
+    def get_password(self, service: str, account: str):
+        return self.request('get', service=service, account=account)
+
+    def delete_password(self, service: str, account: str):
+        self.request('delete', service=service, account=account)
+
+    def suggest_password(self, length=16):
+        return self.request('suggest', length=length)
+
+    def list_accounts(self):
+        return [tuple(name) for name in self.request('list')]
+
+    def search(self, pattern: str, limit: int = SEARCH_LIMIT):
+        return [tuple(name) for name in self.request('search', pattern=pattern, limit=limit)]
+
+class VaultAgent:
+    """ Keeps an unlocked PasswordManager in memory and serves it over a Unix domain socket.
+
+    Requests and responses are single JSON lines. Connections are handled
+    concurrently, but vault calls run one at a time in a worker thread: the
+    vault's memory maps are swapped out on every write, so readers must not
+    overlap with writers. The agent locks itself (drops the manager and
+    exits) after idle_timeout seconds without a request.
+    """
+    ACTIONS = {  # action -> (PasswordManager method, required string parameters)
+        'add': ('add_password', ('service', 'account', 'password')),
+        'get': ('get_password', ('service', 'account')),
+        'delete': ('delete_password', ('service', 'account')),
+        'list': ('list_accounts', ()),
+        'search': ('search', ('pattern',)),
+    }
+
+    def __init__(self, manager: PasswordManager, socket_path: str = DEFAULT_AGENT_SOCKET,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.manager = manager
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self._vault_lock = None
+        self._last_request = 0.0
+        self._connections = {}  # writer -> task handling that connection
+
+    def run(self):
+        import asyncio  # Only the agent itself pays for importing asyncio
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        self._vault_lock = asyncio.Lock()
+        self._last_request = loop.time()
+        self._claim_socket()
+        old_umask = os.umask(0o177)  # Socket is only usable by its owner
+        try:
+            server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        finally:
+            os.umask(old_umask)
+        print(f"Vault agent listening on {self.socket_path}")
+        try:
+            while True:
+                idle = loop.time() - self._last_request
+                if idle >= self.idle_timeout:
+                    break
+                await asyncio.sleep(self.idle_timeout - idle)
+            async with self._vault_lock:
+                self.lock()
+        finally:
+            self.lock()  # Also reached when the agent is cancelled, e.g. by Ctrl-C
+            server.close()
+            # Idle clients may still hold connections open; hang up on them so
+            # their handlers finish before the server waits for them
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _claim_socket(self):
+        os.makedirs(os.path.dirname(self.socket_path) or '.', mode=0o700, exist_ok=True)
+        client = AgentClient.connect(self.socket_path)
+        if client is not None:
+            client.close()
+            raise AgentError(f"An agent is already listening on {self.socket_path}")
+        try:
+            mode = os.lstat(self.socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise AgentError(f"{self.socket_path} exists and is not a socket")
+        os.unlink(self.socket_path)  # Left behind by an agent that did not shut down cleanly
+
+    def lock(self):
+        """ Forgets the unlocked vault and key """
+        if self.manager is not None:
+            self.manager.vault.close()
+            self.manager = None
+        get_fernet.cache_clear()
+        forget_key()
+
+    async def _handle(self, reader, writer):
+        import asyncio
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._last_request = asyncio.get_running_loop().time()
+                response = await self.dispatch(line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # Client hung up, or sent a line longer than the stream limit
+        finally:
+            del self._connections[writer]
+            writer.close()
+
+    async def dispatch(self, line: bytes) -> dict:
+        import asyncio
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                return {'ok': False, 'error': "Requests must be JSON objects"}
+            action = request.get('action')
+            if action == 'suggest':
+                return {'ok': True, 'result': suggest_password(int(request.get('length') or 16))}
+            if action not in self.ACTIONS:
+                return {'ok': False, 'error': f"Unknown action: {action}"}
+            method_name, names = self.ACTIONS[action]
+            params = [request.get(name) for name in names]
+            if not all(isinstance(param, str) and param for param in params):
+                return {'ok': False, 'error': f"{action} needs {', '.join(names)}"}
+            if action == 'search':
+                params.append(int(request.get('limit') or SEARCH_LIMIT))
+            async with self._vault_lock:
+                if self.manager is None:
+                    return {'ok': False, 'error': "The vault agent is locked"}
+                method = getattr(self.manager, method_name)
+                result = await asyncio.get_running_loop().run_in_executor(None, method, *params)
+            return {'ok': True, 'result': result}
+        except Exception as error:  # Report anything, e.g. InvalidToken or OSError, rather than drop the client
+            return {'ok': False, 'error': str(error) or type(error).__name__}
+
+def run_action(args, manager):
     if args.add:
         if not args.service or not args.account or not args.password:
             print("Service, account, and password are required for adding a password.")
@@ -103,7 +1392,7 @@ def main():
             return
         password = manager.get_password(args.service, args.account)
         if password:
-            clear_password = f"{fg(2)}{password}{attr(0)}"
+            clear_password = highlight(password)
             print(f"Password for {args.account} at {args.service}: {clear_password}")
         else:
             print("Password not found")
@@ -117,12 +1406,146 @@ def main():
     
     elif args.suggest:
         length = args.length or 16  # Default length to 16 if not specified
-        password = suggest_password(length)
-        clear_password = f"{fg(2)}{password}{attr(0)}"
-        print(f"Suggested Password: {clear_password}")
+        classes = [name.strip() for name in args.classes.split(',') if name.strip()]
+        try:
+            passwords = generate_passwords(args.count or 1, length, classes, args.min_digits, args.min_symbols)
+            if args.output:
+                count = write_passwords(args.output, passwords)
+                print(f"Wrote {count} passwords to {args.output}")
+            elif args.count:
+                for password in passwords:
+                    sys.stdout.write(password + '\n')
+            else:
+                clear_password = highlight(next(passwords))
+                print(f"Suggested Password: {clear_password}")
+        except (ValueError, OSError) as error:
+            print(error)
+
+    elif args.list:
+        for service, account in manager.list_accounts():
+            print(f"{service}\t{account}")
+
+    elif args.search:
+        matches = manager.search(args.search, args.limit)
+        for service, account in matches:
+            print(f"{service}\t{account}")
+        if not matches:
+            print("No matches found")
+
+    elif args.migrate_to:
+        try:
+            count = manager.migrate_to(args.migrate_to)
+        except ValueError as error:
+            print(f"Migration aborted: {error}")
+            return
+        print(f"Migrated {count} passwords to {args.migrate_to}")
+
+    elif args.import_file:
+        try:
+            count = manager.import_passwords(read_rows(args.import_file))
+        except (ValueError, OSError) as error:
+            print(f"Import aborted: {error}")
+            return
+        print(f"Imported {count} passwords")
+
+    elif args.export_file:
+        export_key = load_key(args.export_key_file) if args.export_key_file else None
+        try:
+            count = manager.export_passwords(args.export_file, export_key)
+        except (ValueError, OSError) as error:
+            print(f"Export aborted: {error}")
+            return
+        print(f"Exported {count} passwords")
 
     else:
-        print("No action specified. Use --add, --get, --delete, or --suggest.")
-        
+        print("No action specified. Use --add, --get, --delete, --suggest, --list, --search, --import, --export, or --migrate-to.")
+
+def main():
+    imported = time.perf_counter()
+    parser = argparse.ArgumentParser(description='Password Manager')
+    parser.add_argument('--key-file', help='Path to the master key file (not needed while an agent is running)')
+    parser.add_argument('--vault', help='Vault path or URI: PATH, file:PATH or sqlite:PATH (default: passwords.json)')
+    parser.add_argument('--migrate-to', metavar='URI', help='Copy every record into a new, empty vault at this path or URI')
+    parser.add_argument('--add', action='store_true', help='Add a password for an account')
+    parser.add_argument('--get', action='store_true', help='Get a password for an account')
+    parser.add_argument('--delete', action='store_true', help='Delete a password for an account')
+    parser.add_argument('--suggest', action='store_true', help='Suggest a random password')
+    parser.add_argument('--service', help='The service for which the action is performed')
+    parser.add_argument('--account', help='The account for which the action is performed')
+    parser.add_argument('--password', help='The password to add for an account')
+    parser.add_argument('--length', type=int, help='Length of the suggested password')
+    parser.add_argument('--count', type=int, help='Number of passwords to suggest, printed one per line')
+    parser.add_argument('--classes', default=','.join(CHARACTER_CLASSES),
+                        help='Comma-separated character classes for suggested passwords (lower,upper,digits,symbols)')
+    parser.add_argument('--min-digits', type=int, default=0, help='Minimum digits in each suggested password')
+    parser.add_argument('--min-symbols', type=int, default=0, help='Minimum symbols in each suggested password')
+    parser.add_argument('--output', metavar='FILE', help='Write suggested passwords to a file instead of stdout')
+    parser.add_argument('--list', action='store_true', help='List every stored service and account')
+    parser.add_argument('--search', metavar='PATTERN', help='Search services and accounts by name')
+    parser.add_argument('--limit', type=int, default=SEARCH_LIMIT, help='Maximum number of search results')
+    parser.add_argument('--import', dest='import_file', metavar='FILE', help='Import passwords from a CSV or JSONL file')
+    parser.add_argument('--export', dest='export_file', metavar='FILE', help='Export passwords to a CSV or JSONL file')
+    parser.add_argument('--export-key-file', help='Export to a new vault encrypted with this key file instead of plaintext')
+    parser.add_argument('--agent', action='store_true', help='Unlock the vault and serve requests over a Unix socket')
+    parser.add_argument('--agent-socket', default=DEFAULT_AGENT_SOCKET, help='Socket path of the vault agent')
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help='Seconds without requests before the agent locks itself')
+    parser.add_argument('--no-agent', action='store_true', help='Open the vault directly even if an agent is running')
+    parser.add_argument('--cache-key', action='store_true',
+                        help='Cache the derived key in the system keyring until the key file changes')
+    parser.add_argument('--forget-key', action='store_true', help='Remove the cached key for --key-file from the keyring')
+    parser.add_argument('--profile', action='store_true', help='Print per-phase timings as JSON to stderr')
+
+    args = parser.parse_args()
+    if args.count is not None and args.count < 1:
+        parser.error("--count must be at least 1")
+    if args.length is not None and args.length < 1:
+        parser.error("--length must be at least 1")
+
+    if args.profile:
+        profiler.enabled = True
+        profiler.add('import', imported - _STARTED)
+
+    if args.forget_key:
+        if not args.key_file:
+            parser.error("--key-file is required for --forget-key")
+        if forget_key(args.key_file):
+            print("Cached Key Removed")
+        else:
+            print("No usable keyring is available, so there is no cached key to remove.")
+        return
+
+    if args.cache_key and _keyring() is None:
+        _warn_no_keyring("The keyring package is not installed")
+
+    manager = None
+    if ((args.add or args.get or args.delete or args.list or args.search)
+            and not (args.agent or args.no_agent or args.vault)):  # The agent serves the vault it was started with
+        manager = AgentClient.connect(args.agent_socket)
+    if manager is None and not args.suggest:
+        if not args.key_file:
+            parser.error("--key-file is required unless a vault agent is running")
+        try:
+            manager = PasswordManager.from_key_file(args.vault or DEFAULT_VAULT, args.key_file, args.cache_key)
+        except ValueError as error:
+            print(f"Cannot open vault: {error}")
+            return
+
+    if args.agent:
+        try:
+            VaultAgent(manager, args.agent_socket, args.idle_timeout).run()
+        except AgentError as error:
+            print(error)
+            return
+        except KeyboardInterrupt:
+            pass
+        print("Vault agent locked")
+        return
+
+    with profiler.phase('operation'):
+        run_action(args, manager)
+    if args.profile:
+        print(json.dumps(profiler.report()), file=sys.stderr)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,22 @@
+import socket
+
+import pytest
+
+from main import AgentError, VaultAgent
+
+
+def test_claim_socket_refuses_other_files(tmp_path):
+    path = tmp_path / 'passwords.json'
+    path.write_text('not a socket')
+    with pytest.raises(AgentError):
+        VaultAgent(None, str(path))._claim_socket()
+    assert path.read_text() == 'not a socket'
+
+
+def test_claim_socket_removes_stale_socket(tmp_path):
+    path = str(tmp_path / 'agent.sock')
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()  # Bound but never listening, like an agent that crashed
+    VaultAgent(None, path)._claim_socket()
+    assert not (tmp_path / 'agent.sock').exists()
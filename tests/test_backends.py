@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from main import PasswordManager, SQLiteVault, VaultFile, generate_key, open_backend
+
+ROWS = [('mail', 'alice', 'secret'), ('mail', 'bob', 'hunter2'), ('bank', 'alice', 'pin')]
+
+
+@pytest.fixture
+def key(tmp_path):
+    key_file = tmp_path / 'key'
+    key_file.write_bytes(os.urandom(64))
+    return generate_key(str(key_file))
+
+
+@pytest.mark.parametrize('uri, backend, path', [
+    ('sqlite:vault.bin', SQLiteVault, 'vault.bin'),
+    ('sqlite:///abs/vault.db', SQLiteVault, '/abs/vault.db'),
+    ('file:vault.db', VaultFile, 'vault.db'),
+    ('file:///abs/vault', VaultFile, '/abs/vault'),
+    ('vault.db', SQLiteVault, 'vault.db'),
+    ('vault.SQLite3', SQLiteVault, 'vault.SQLite3'),
+    ('vault.sqlite', SQLiteVault, 'vault.sqlite'),
+    ('passwords.json', VaultFile, 'passwords.json'),
+    ('C:vault', VaultFile, 'C:vault'),
+])
+def test_open_backend_parses_uris(uri, backend, path):
+    vault = open_backend(uri)
+    assert type(vault) is backend
+    assert vault.path == path
+
+
+def test_sqlite_round_trip(tmp_path, key):
+    uri = 'sqlite:' + str(tmp_path / 'vault.bin')
+    manager = PasswordManager(uri, key)
+    manager.import_passwords(ROWS)
+    manager.add_password('mail', 'alice', 'changed')
+    manager.delete_password('bank', 'alice')
+    manager.vault.close()
+
+    reopened = PasswordManager(uri, key)
+    assert reopened.get_password('mail', 'alice') == 'changed'
+    assert reopened.get_password('bank', 'alice') is None
+    assert reopened.list_accounts() == [('mail', 'alice'), ('mail', 'bob')]
+    assert reopened.search('bo') == [('mail', 'bob')]
+    assert reopened.vault.live == 2
+
+
+@pytest.mark.parametrize('source_name, target_name', [('passwords.json', 'copy.db'), ('passwords.db', 'copy.json')])
+def test_migrate_between_backends(tmp_path, key, source_name, target_name):
+    source = PasswordManager(str(tmp_path / source_name), key)
+    source.import_passwords(ROWS)
+    target_path = str(tmp_path / target_name)
+    assert source.migrate_to(target_path) == len(ROWS)
+    target = PasswordManager(target_path, key)
+    assert type(target.vault) is not type(source.vault)
+    assert sorted(target.iter_passwords()) == sorted(ROWS)
+
+
+@pytest.mark.parametrize('target_name', ['full.json', 'full.db'])
+def test_migrate_refuses_non_empty_target(tmp_path, key, target_name):
+    source = PasswordManager(str(tmp_path / 'passwords.json'), key)
+    source.import_passwords(ROWS)
+    target = PasswordManager(str(tmp_path / target_name), key)
+    target.add_password('kept', 'carol', 'secret')
+    target.vault.close()
+    with pytest.raises(ValueError, match='already holds records'):
+        source.migrate_to(str(tmp_path / target_name))
+    with pytest.raises(ValueError, match='source vault'):
+        source.migrate_to(source.vault.path)
+    assert list(PasswordManager(str(tmp_path / target_name), key).iter_passwords()) == [('kept', 'carol', 'secret')]
+
+
+def test_non_sqlite_file_is_refused(tmp_path, key):
+    path = tmp_path / 'notes.db'
+    path.write_text('not a database\n' * 100)
+    source = PasswordManager(str(tmp_path / 'passwords.json'), key)
+    with pytest.raises(ValueError, match='not a usable SQLite vault'):
+        source.migrate_to(str(path))
+    with pytest.raises(ValueError, match='not a usable SQLite vault'):
+        PasswordManager(str(path), key)
+    assert path.read_text() == 'not a database\n' * 100
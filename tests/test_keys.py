@@ -0,0 +1,93 @@
+import hashlib
+import os
+from base64 import urlsafe_b64encode
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from main import forget_key, generate_key, load_key
+
+
+class KeyringError(Exception):
+    pass
+
+
+class FakeKeyring:
+    errors = SimpleNamespace(KeyringError=KeyringError)
+
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.passwords = {}
+
+    def _check(self):
+        if self.broken:
+            raise KeyringError("No recommended backend was available")
+
+    def get_password(self, service, name):
+        self._check()
+        return self.passwords.get((service, name))
+
+    def set_password(self, service, name, password):
+        self._check()
+        self.passwords[(service, name)] = password
+
+    def delete_password(self, service, name):
+        self._check()
+        del self.passwords[(service, name)]
+
+
+@pytest.fixture
+def key_file(tmp_path):
+    path = tmp_path / 'key'
+    path.write_bytes(os.urandom(1000))
+    yield str(path)
+    forget_key()
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    calls = []
+
+    def counting_generate_key(path):
+        calls.append(path)
+        return generate_key(path)
+    monkeypatch.setattr(main, 'generate_key', counting_generate_key)
+    return calls
+
+
+def test_chunked_hash_matches_single_pass(key_file, monkeypatch):
+    monkeypatch.setattr(main, 'KEY_CHUNK_SIZE', 7)  # 1000 bytes leaves a partial last chunk
+    with open(key_file, 'rb') as file:
+        expected = urlsafe_b64encode(hashlib.sha256(file.read()).digest())
+    assert main.generate_key(key_file) == expected
+
+
+def test_changed_key_file_is_rehashed(key_file, hashes):
+    first = load_key(key_file)
+    assert load_key(key_file) == first
+    assert len(hashes) == 1
+    with open(key_file, 'ab') as file:
+        file.write(b'more')
+    assert load_key(key_file) != first
+    assert len(hashes) == 2
+
+
+def test_keyring_survives_process_cache(key_file, hashes, monkeypatch):
+    keyring = FakeKeyring()
+    monkeypatch.setattr(main, '_keyring', lambda: keyring)
+    key = load_key(key_file, use_keyring=True)
+    forget_key()  # A new process starts with an empty in-process cache
+    assert load_key(key_file, use_keyring=True) == key
+    assert len(hashes) == 1
+    assert forget_key(key_file)
+    assert not keyring.passwords
+
+
+def test_broken_keyring_falls_back_to_process_cache(key_file, hashes, monkeypatch, capsys):
+    monkeypatch.setattr(main, '_keyring', lambda: FakeKeyring(broken=True))
+    key = load_key(key_file, use_keyring=True)
+    assert load_key(key_file, use_keyring=True) == key
+    assert len(hashes) == 1
+    assert 'will not be cached' in capsys.readouterr().out
+    assert not forget_key(key_file)
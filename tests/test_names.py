@@ -0,0 +1,66 @@
+import random
+
+import main
+from main import NameIndex
+
+
+def test_listing_is_case_insensitive_like_search():
+    names = NameIndex([('mail', 'Zed'), ('Bank', 'alice'), ('mail', 'bob'), ('atm', 'Carol')])
+    assert names.listing() == [('atm', 'Carol'), ('Bank', 'alice'), ('mail', 'bob'), ('mail', 'Zed')]
+    assert names.search('mail', 10) == [('mail', 'bob'), ('mail', 'Zed')]
+
+
+def test_listing_follows_adds_and_removes():
+    names = NameIndex([('mail', 'bob')])
+    names.add('Mail', 'alice')
+    names.add('mail', 'Alice')
+    names.remove('mail', 'bob')
+    assert names.listing() == [('Mail', 'alice'), ('mail', 'Alice')]
+
+
+def reference_search(names, pattern, limit):
+    pattern = pattern.lower()
+    services = sorted({service for service, _ in names}, key=lambda service: (service.lower(), service))
+    accounts = sorted(set(names), key=lambda pair: (pair[1].lower(), *pair))
+
+    def expand(matching):
+        for service in matching:
+            yield from sorted(((s, a) for s, a in names if s == service), key=lambda pair: (pair[1].lower(), pair[1]))
+
+    tiers = [
+        expand(s for s in services if s.lower() == pattern),
+        (pair for pair in accounts if pair[1].lower() == pattern),
+        expand(s for s in services if s.lower().startswith(pattern)),
+        (pair for pair in accounts if pair[1].lower().startswith(pattern)),
+    ]
+    if len(pattern) >= 3:
+        tiers.append(expand(s for s in services if pattern in s.lower()))
+        tiers.append(pair for pair in accounts if pattern in pair[1].lower())
+    results = {}
+    for tier in tiers:
+        for pair in tier:
+            results[pair] = None
+    return list(results)[:limit]
+
+
+def test_search_matches_reference_ranking(monkeypatch):
+    rng = random.Random(7)
+    words = ['Mail', 'mail', 'bank', 'Example', 'shop', 'cloud', 'git']
+    names = list({
+        (f"{rng.choice(words)}{rng.randrange(30)}.{rng.choice(words).lower()}.com",
+         f"{rng.choice(words)}{rng.randrange(500)}@{rng.choice(words)}.org")
+        for _ in range(2000)
+    })
+    index = NameIndex(names)
+    patterns = ['mail', 'ail1', 'example', 'le.com', 'k1', '@git', 'bank2.', 'oud32', 'zzz']
+    expected = {pattern: reference_search(names, pattern, 5000) for pattern in patterns}
+    for scan_ratio in (1, 4, 10 ** 9):  # Force each of the trigram and scan paths
+        monkeypatch.setattr(main, 'SCAN_RATIO', scan_ratio)
+        for pattern in patterns:
+            for limit in (1, 7, 50, 5000):
+                assert index.search(pattern, limit) == expected[pattern][:limit], (pattern, limit)
+
+
+def test_fuzzy_fallback_finds_typos():
+    names = NameIndex([('service-1.example.com', 'alice'), ('bank', 'bob')])
+    assert names.search('servise-1', 5) == [('service-1.example.com', 'alice')]
@@ -0,0 +1,72 @@
+import sys
+from collections import Counter
+
+import pytest
+
+import main
+from main import CHARACTER_CLASSES, generate_passwords, suggest_password
+
+DIGITS = set(CHARACTER_CLASSES['digits'])
+SYMBOLS = set(CHARACTER_CLASSES['symbols'])
+
+
+def test_suggest_password_length():
+    assert len(suggest_password(24)) == 24
+
+
+def test_extreme_policy_is_generated():
+    passwords = list(generate_passwords(200, 20, min_digits=10, min_symbols=10))
+    assert len(passwords) == 200
+    for password in passwords:
+        assert len(password) == 20
+        assert sum(character in DIGITS for character in password) == 10
+        assert sum(character in SYMBOLS for character in password) == 10
+
+
+def test_all_digits_policy_with_other_classes():
+    for password in generate_passwords(100, 12, ('digits', 'lower'), min_digits=12):
+        assert set(password) <= DIGITS
+
+
+def test_impossible_policy_is_rejected():
+    with pytest.raises(ValueError):
+        generate_passwords(1, 8, min_digits=5, min_symbols=4)
+    with pytest.raises(ValueError):
+        generate_passwords(1, 8, ('lower',), min_digits=1)
+    with pytest.raises(ValueError):
+        generate_passwords(1, 8, ())
+
+
+def test_rejected_policy_leaves_output_file_alone(tmp_path, monkeypatch, capsys):
+    output = tmp_path / 'out.txt'
+    output.write_text('earlier passwords\n')
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--suggest', '--count', '5', '--min-digits', '99',
+                                      '--output', str(output)])
+    main.main()
+    assert 'cannot add up' in capsys.readouterr().out
+    assert output.read_text() == 'earlier passwords\n'
+
+
+@pytest.mark.parametrize('count', ['0', '-3'])
+def test_count_below_one_is_rejected(monkeypatch, count):
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--suggest', '--count', count])
+    with pytest.raises(SystemExit):
+        main.main()
+
+
+def test_characters_are_unbiased():
+    alphabet = ''.join(CHARACTER_CLASSES.values())
+    counts = Counter(''.join(generate_passwords(20000, 37)))
+    expected = 20000 * 37 / len(alphabet)
+    assert set(counts) == set(alphabet)
+    # Each count has a standard deviation of about 99; modulo bias would skew some by ~2x
+    assert all(abs(count - expected) < 0.05 * expected for count in counts.values())
+
+
+def test_required_characters_land_in_every_position():
+    positions = Counter()
+    for password in generate_passwords(20000, 8, ('lower', 'digits'), min_digits=4):
+        positions.update(i for i, character in enumerate(password) if character in DIGITS)
+    # Each position holds a digit about 4/8 + 4/8 * 10/36 of the time
+    expected = 20000 * (0.5 + 0.5 * 10 / 36)
+    assert all(abs(positions[i] - expected) < 0.05 * expected for i in range(8))
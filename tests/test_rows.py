@@ -0,0 +1,87 @@
+import json
+import os
+import stat
+
+import pytest
+
+from main import PasswordManager, generate_key, read_rows
+
+ROWS = [('mail', 'alice', 'secret'), ('bank', 'bob', 'p,a"ss')]
+
+
+@pytest.fixture
+def key(tmp_path):
+    key_file = tmp_path / 'key'
+    key_file.write_bytes(os.urandom(64))
+    return generate_key(str(key_file))
+
+
+@pytest.fixture
+def manager(tmp_path, key):
+    manager = PasswordManager(str(tmp_path / 'passwords.json'), key)
+    manager.import_passwords(ROWS)
+    return manager
+
+
+@pytest.mark.parametrize('name', ['export.csv', 'export.jsonl'])
+def test_export_import_round_trip(tmp_path, key, manager, name):
+    path = str(tmp_path / name)
+    assert manager.export_passwords(path) == 2
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    restored = PasswordManager(str(tmp_path / 'restored.json'), key)
+    assert restored.import_passwords(read_rows(path)) == 2
+    assert sorted(restored.iter_passwords()) == sorted(ROWS)
+
+
+def test_export_refuses_existing_file(tmp_path, manager):
+    path = tmp_path / 'public.csv'
+    path.write_text('keep me')
+    os.chmod(path, 0o644)
+    with pytest.raises(ValueError, match='already exists'):
+        manager.export_passwords(str(path))
+    assert path.read_text() == 'keep me'
+
+
+def test_export_refuses_source_vault(manager):
+    with pytest.raises(ValueError, match='source vault'):
+        manager.export_passwords(manager.vault.path, manager.key)
+    with pytest.raises(ValueError, match='source vault'):
+        manager.export_passwords(manager.vault.path)
+
+
+def test_encrypted_export_needs_empty_target(tmp_path, manager):
+    other_key = generate_key(manager.vault.path)  # Any file will do as a key file
+    target = str(tmp_path / 'copy.json')
+    assert manager.export_passwords(target, other_key) == 2
+    assert sorted(PasswordManager(target, other_key).iter_passwords()) == sorted(ROWS)
+    with pytest.raises(ValueError, match='already holds records'):
+        manager.export_passwords(target, other_key)
+
+
+def test_csv_with_byte_order_mark(tmp_path):
+    path = tmp_path / 'spreadsheet.csv'
+    path.write_bytes('service,account,password\r\ncafé,alice,secret\r\n'.encode('utf-8-sig'))
+    assert list(read_rows(str(path))) == [('café', 'alice', 'secret')]
+
+
+@pytest.mark.parametrize('line', [
+    '[1, 2]',
+    '"row"',
+    '{"service": "mail", "account": "alice", "password": 123}',
+    '{"service": "mail", "account": "alice"}',
+    '{"service": "", "account": "alice", "password": "secret"}',
+])
+def test_invalid_jsonl_rows_are_rejected(tmp_path, line):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text(json.dumps(dict(zip(('service', 'account', 'password'), ROWS[0]))) + '\n' + line + '\n')
+    with pytest.raises(ValueError, match='Row 2'):
+        list(read_rows(str(path)))
+
+
+def test_rejected_import_writes_nothing(tmp_path, manager):
+    path = tmp_path / 'rows.csv'
+    path.write_text('service,account,password\nnew,carol,secret\nnew,dave,\n')
+    with pytest.raises(ValueError):
+        manager.import_passwords(read_rows(str(path)))
+    assert sorted(manager.iter_passwords()) == sorted(ROWS)
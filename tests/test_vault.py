@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import main
+from main import INDEX_ENTRY, INDEX_HEADER, INDEX_MAGIC, VAULT_MAGIC, PasswordManager, encrypt_password, generate_key
+
+
+@pytest.fixture
+def key(tmp_path):
+    key_file = tmp_path / 'key'
+    key_file.write_bytes(os.urandom(64))
+    return generate_key(str(key_file))
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    return str(tmp_path / 'passwords.json')
+
+
+def vault_lines(path):
+    with open(path, 'rb') as file:
+        return file.read()[len(VAULT_MAGIC):].splitlines()
+
+
+def test_legacy_blob_is_migrated(key, vault_path):
+    passwords = {'mail': {'alice': 'secret', 'bob': 'hunter2'}, 'bank': {'alice': 'pin'}}
+    blob = encrypt_password(key, json.dumps(passwords))
+    with open(vault_path, 'w') as file:
+        file.write(blob)
+
+    manager = PasswordManager(vault_path, key)
+
+    assert manager.load_passwords() == passwords
+    with open(vault_path, 'rb') as file:
+        assert file.read(len(VAULT_MAGIC)) == VAULT_MAGIC
+    with open(vault_path + '.bak') as file:
+        assert file.read() == blob
+
+
+def test_compaction_drops_superseded_records(key, vault_path, monkeypatch):
+    monkeypatch.setattr(main, 'COMPACT_MIN_DEAD', 4)
+    manager = PasswordManager(vault_path, key)
+    manager.add_password('other', 'carol', 'kept')
+    for version in range(8):
+        manager.add_password('mail', 'alice', f"v{version}")
+
+    assert len(vault_lines(vault_path)) < 9
+    assert manager.vault.dead_records < manager.vault.live + 4
+    reopened = PasswordManager(vault_path, key)
+    assert reopened.get_password('mail', 'alice') == 'v7'
+    assert reopened.get_password('other', 'carol') == 'kept'
+
+
+def test_torn_line_is_ignored_then_truncated(key, vault_path):
+    manager = PasswordManager(vault_path, key)
+    manager.add_password('mail', 'alice', 'secret')
+    manager.vault.close()
+    with open(vault_path, 'ab') as file:
+        file.write(b'0123456789abcdef half-written')
+
+    manager = PasswordManager(vault_path, key)
+    assert manager.list_accounts() == [('mail', 'alice')]
+    manager.add_password('bank', 'alice', 'pin')
+
+    assert b'half-written' not in b''.join(vault_lines(vault_path))
+    reopened = PasswordManager(vault_path, key)
+    assert reopened.get_password('mail', 'alice') == 'secret'
+    assert reopened.get_password('bank', 'alice') == 'pin'
+
+
+def test_corrupt_index_is_rebuilt(key, vault_path):
+    manager = PasswordManager(vault_path, key)
+    for number in range(5):
+        manager.add_password('service', f"account{number}", f"password{number}")
+    manager.vault.close()
+    PasswordManager(vault_path, key).vault.close()  # Opening writes the index
+    with open(vault_path + '.idx', 'r+b') as file:
+        file.truncate(os.path.getsize(vault_path + '.idx') - 5)  # Torn index write
+
+    manager = PasswordManager(vault_path, key)
+    assert manager.get_password('service', 'account0') == 'password0'
+    with open(vault_path + '.idx', 'rb') as file:
+        assert file.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+    assert os.path.getsize(vault_path + '.idx') == INDEX_HEADER.size + 5 * INDEX_ENTRY.size
+
+
+def test_stale_index_is_rebuilt(key, vault_path):
+    manager = PasswordManager(vault_path, key)
+    manager.add_password('mail', 'alice', 'old')
+    manager.vault.close()
+    PasswordManager(vault_path, key).vault.close()
+    shutil.copy2(vault_path + '.idx', vault_path + '.idx.old')
+
+    manager = PasswordManager(vault_path, key)
+    manager.add_password('bank', 'bob', 'pin')
+    manager.vault.compact()  # Replaces the vault, so the old index points at the wrong file
+    manager.vault.close()
+    os.replace(vault_path + '.idx.old', vault_path + '.idx')
+
+    reopened = PasswordManager(vault_path, key)
+    assert reopened.get_password('mail', 'alice') == 'old'
+    assert reopened.get_password('bank', 'bob') == 'pin'
+    assert reopened.vault.live == 2
+
+
+def concurrent_writer(vault_path, key, worker, count):
+    # Small thresholds so index rebuilds and compactions race with the other writers
+    main.INDEX_TAIL_MAX = 8
+    main.COMPACT_MIN_DEAD = 4
+    manager = PasswordManager(vault_path, key)
+    expected = {}
+    for i in range(count):
+        service, account = f"svc{i % 5}", f"w{worker}-{i}"
+        manager.add_password(service, account, f"{worker}:{i}")
+        expected[(service, account)] = f"{worker}:{i}"
+        if i % 2:  # Leave dead records behind for compaction
+            manager.delete_password(service, account)
+            del expected[(service, account)]
+    return expected
+
+
+@pytest.mark.parametrize('vault_name', ['passwords.json', 'passwords.db'])
+def test_concurrent_writers_keep_every_update(tmp_path, key, vault_name):
+    vault_path = str(tmp_path / vault_name)
+    workers, count = 4, 60
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(concurrent_writer, [vault_path] * workers, [key] * workers,
+                           range(workers), [count] * workers)
+        expected = {}
+        for result in results:
+            expected.update(result)
+    stored = {(service, account): password
+              for service, account, password in PasswordManager(vault_path, key).iter_passwords()}
+    assert stored == expected